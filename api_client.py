@@ -3,67 +3,184 @@
 Содержит функции для получения данных из exchangerate-api.com
 """
 
+import atexit
+import random
+import time
+
 import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
 from typing import Optional, Dict, Any
 
+try:
+    import ijson  # type: ignore
+except ImportError:
+    ijson = None  # откат на полный разбор response.json()
+
 # Список основных валют для обновления
 FAVORITE_CURRENCIES = ["USD", "EUR", "GBP", "RUB"]
 
+# Версия схемы currency.json: файл хранит одну таблицу курсов
+# относительно BASE_CURRENCY, кросс-курсы вычисляются на лету
+SCHEMA_VERSION = 2
+BASE_CURRENCY = "USD"
+
+# Общая сессия с keep-alive: все запросы к open.er-api.com
+# переиспользуют одно TCP/TLS-соединение вместо нового рукопожатия на каждый вызов
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+atexit.register(_SESSION.close)
+
+# Параметры повторных попыток при временных ошибках (429, 5xx, сбои сети)
+_MAX_ATTEMPTS = 4
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-def get_currency_rate(currency_code: str) -> Optional[Dict[str, Any]]:
+# Единственные поля ответа API, которые использует приложение;
+# остальные (provider, documentation, terms_of_use и т.д.) отбрасываются
+_RESPONSE_KEYS = {"result", "rates", "error-type", "time_last_update_unix"}
+
+# Маркер ответа 304 Not Modified: данные не менялись, тело не передавалось
+NOT_MODIFIED = object()
+
+
+def _retry_delay(response: Optional["requests.Response"], attempt: int) -> float:
+    """
+    Вычислить паузу перед повторной попыткой.
+
+    Экспоненциальная задержка со случайным разбросом (jitter), чтобы
+    повторные запросы разных клиентов не синхронизировались.
+    Заголовок Retry-After из ответа имеет приоритет.
+
+    Args:
+        response (Optional[requests.Response]): Ответ сервера или None при сбое сети
+        attempt (int): Номер попытки, начиная с 0
+
+    Returns:
+        float: Задержка в секундах
+    """
+    delay = float(2 ** attempt)
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                pass
+    return delay + random.uniform(0, 0.5)
+
+
+def get_currency_rate(currency_code: str,
+                      etag: Optional[str] = None,
+                      last_modified: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Получить курс валюты относительно базовой валюты из API.
 
+    Если переданы валидаторы кэша (etag/last_modified), запрос выполняется
+    условно: при неизменившихся данных сервер отвечает 304 без тела,
+    и функция возвращает маркер NOT_MODIFIED.
+
     Args:
         currency_code (str): Код базовой валюты (например, 'USD')
+        etag (Optional[str]): ETag предыдущего ответа для If-None-Match
+        last_modified (Optional[str]): Last-Modified предыдущего ответа
+            для If-Modified-Since
 
     Returns:
-        Optional[Dict[str, Any]]: Словарь с данными о курсах или None при ошибке
+        Optional[Dict[str, Any]]: Словарь с данными о курсах,
+            NOT_MODIFIED если данные не менялись, или None при ошибке
     """
     URL = f"https://open.er-api.com/v6/latest/{currency_code}"
 
-    try:
-        response = requests.get(URL, timeout=10)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            response = _SESSION.get(URL, timeout=10, headers=headers,
+                                    stream=ijson is not None)
+        except requests.RequestException as e:
+            if attempt < _MAX_ATTEMPTS - 1:
+                print(f"Ошибка сети: {e}. Повторная попытка...")
+                time.sleep(_retry_delay(None, attempt))
+                continue
+            print(f"Ошибка сети: {e}")
+            return None
+        except Exception as e:
+            print(f"Неожиданная ошибка: {e}")
+            return None
+
+        if response.status_code in _RETRY_STATUSES and attempt < _MAX_ATTEMPTS - 1:
+            print(f"Временная ошибка HTTP {response.status_code}. Повторная попытка...")
+            time.sleep(_retry_delay(response, attempt))
+            continue
+
+        if response.status_code == 304:
+            return NOT_MODIFIED
+
         if response.status_code != 200:
             print(f"Ошибка HTTP {response.status_code}: {response.text}")
             return None
 
-        data = response.json()
+        if ijson is not None:
+            # Потоковый разбор: извлекаем только нужные поля,
+            # не материализуя весь конверт ответа
+            response.raw.decode_content = True
+            data = {key: value for key, value in
+                    ijson.kvitems(response.raw, '', use_float=True)
+                    if key in _RESPONSE_KEYS}
+        else:
+            data = response.json()
         if data.get('result') != 'success':
             print(f"Ошибка API: {data.get('error-type', 'Неизвестная ошибка')}")
             return None
 
+        # Запоминаем валидаторы кэша для будущих условных запросов
+        data["_etag"] = response.headers.get("ETag")
+        data["_last_modified"] = response.headers.get("Last-Modified")
         return data
 
-    except requests.RequestException as e:
-        print(f"Ошибка сети: {e}")
-        return None
-    except Exception as e:
-        print(f"Неожиданная ошибка: {e}")
-        return None
+    return None
 
 
-def update_currency_rates() -> Dict[str, Any]:
+def update_currency_rates(cached: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
-    Обновить курсы всех основных валют и вернуть собранные данные.
+    Обновить курсы валют и вернуть единую таблицу курсов.
+
+    Запрашивается только таблица курсов для BASE_CURRENCY: любой
+    кросс-курс вычисляется из нее как rates[target] / rates[base],
+    поэтому хранить отдельные таблицы для каждой базовой валюты не нужно.
+    Если передан предыдущий конверт данных, запрос выполняется условно
+    по его ETag/Last-Modified: ответ 304 означает, что курсы не менялись,
+    и кэшированные данные переиспользуются без передачи тела.
+
+    Args:
+        cached (Optional[Dict[str, Any]]): Предыдущий конверт данных
+            с валидаторами кэша
 
     Returns:
-        Dict[str, Any]: Словарь с данными о курсах валют
+        Dict[str, Any]: Словарь вида {"schema_version", "base", "rates", ...}
     """
-    all_data = {}
-    success_count = 0
-
     print("Получение курсов валют...")
-
-    for currency in FAVORITE_CURRENCIES:
-        print(f"  Получение данных для {currency}...")
-        rate_data = get_currency_rate(currency)
-
-        if rate_data:
-            all_data[currency] = rate_data
-            success_count += 1
-        else:
-            print(f"  Не удалось получить данные для {currency}")
-
-    print(f"Успешно получено данных для {success_count}/{len(FAVORITE_CURRENCIES)} валют")
-    return all_data
+    etag = cached.get("_etag") if cached else None
+    last_modified = cached.get("_last_modified") if cached else None
+    base_data = get_currency_rate(BASE_CURRENCY, etag=etag, last_modified=last_modified)
+
+    if base_data is NOT_MODIFIED:
+        print("✓ Курсы не изменились (304), используются кэшированные данные")
+        return cached
+
+    if not base_data:
+        print(f"Не удалось получить данные для {BASE_CURRENCY}")
+        return {}
+
+    print(f"✓ Получена таблица курсов ({len(base_data['rates'])} валют)")
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "base": BASE_CURRENCY,
+        "time_last_update_unix": base_data.get("time_last_update_unix"),
+        "rates": base_data["rates"],
+        "_etag": base_data.get("_etag"),
+        "_last_modified": base_data.get("_last_modified"),
+    }
@@ -3,14 +3,42 @@
 Содержит функции для взаимодействия с пользователем.
 """
 
+import re
+import sys
+import threading
+
 from storage import (
     load_or_update_data,
     get_available_currencies,
     get_exchange_rate,
     convert_currency,
-    update_currency_rates
+    is_currency_available,
+    force_update_data
 )
 
+# Допустимый формат суммы: целое или десятичное число;
+# проверка регулярным выражением вместо try/except вокруг float()
+_AMOUNT_RE = re.compile(r"^\d+(\.\d+)?$")
+
+# Множество доступных кодов валют, вычисляется один раз за сессию:
+# проверка ввода сводится к поиску в set вместо обращения к хранилищу
+_AVAILABLE = None
+
+# Индекс префиксов кодов валют для быстрого поиска:
+# {"U": [...], "US": [...], "USD": ["USD"]}
+_PREFIX_INDEX = None
+
+
+def _refresh_available_currencies():
+    """Обновить кэш доступных валют (после загрузки или обновления данных)"""
+    global _AVAILABLE, _PREFIX_INDEX
+    currencies = get_available_currencies()
+    _AVAILABLE = frozenset(currencies)
+    _PREFIX_INDEX = {}
+    for code in currencies:
+        for i in range(1, len(code) + 1):
+            _PREFIX_INDEX.setdefault(code[:i], []).append(code)
+
 
 def display_available_currencies():
     """Показать доступные валюты в удобном формате"""
@@ -19,14 +47,17 @@ def display_available_currencies():
         print("Нет доступных валют")
         return
 
-    print(f"\nДоступные валюты ({len(currencies)}):")
-    print("-" * 50)
-
-    # Разделим на группы по 10 валют для лучшей читаемости
-    for i in range(0, len(currencies), 10):
-        group = currencies[i:i+10]
-        print(" ".join(f"{code:>4}" for code in group))
-    print("-" * 50)
+    # Разделим на группы по 10 валют для лучшей читаемости;
+    # вывод собирается в одну строку и пишется одним вызовом,
+    # чтобы не дергать flush терминала на каждую строку
+    lines = [" ".join(f"{code:>4}" for code in currencies[i:i+10])
+             for i in range(0, len(currencies), 10)]
+    sys.stdout.write(
+        f"\nДоступные валюты ({len(currencies)}):\n"
+        + "-" * 50 + "\n"
+        + "\n".join(lines) + "\n"
+        + "-" * 50 + "\n"
+    )
 
 
 def show_menu():
@@ -51,8 +82,11 @@ def get_valid_currency(prompt: str):
             print("Код валюты не может быть пустым")
             continue
 
-        available = get_available_currencies()
-        if currency in available:
+        if _AVAILABLE is not None:
+            found = currency in _AVAILABLE
+        else:
+            found = is_currency_available(currency)
+        if found:
             return currency
         else:
             print(f"Валюта {currency} не найдена. Попробуйте еще раз.")
@@ -61,14 +95,16 @@ def get_valid_currency(prompt: str):
 def get_valid_amount():
     """Получить корректную сумму от пользователя"""
     while True:
-        try:
-            amount = float(input("Введите сумму: "))
-            if amount <= 0:
-                print("Сумма должна быть положительной")
-                continue
-            return amount
-        except ValueError:
+        raw = input("Введите сумму: ").strip().replace(",", ".")
+        if not _AMOUNT_RE.match(raw):
             print("Некорректная сумма. Введите число.")
+            continue
+
+        amount = float(raw)
+        if amount <= 0:
+            print("Сумма должна быть положительной")
+            continue
+        return amount
 
 
 def currency_conversion_interface():
@@ -85,7 +121,7 @@ def currency_conversion_interface():
     amount = get_valid_amount()
 
     # Конвертация
-    converted_amount, error = convert_currency(amount, base_currency, target_currency)
+    converted_amount, rate, error = convert_currency(amount, base_currency, target_currency)
 
     if error:
         print(f"Ошибка: {error}")
@@ -93,10 +129,9 @@ def currency_conversion_interface():
         print(f"\nРезультат конвертации:")
         print(f"{amount:.2f} {base_currency} = {converted_amount:.4f} {target_currency}")
 
-        # Показать обратный курс
-        reverse_rate, _ = get_exchange_rate(target_currency, base_currency)
-        if reverse_rate:
-            print(f"Обратный курс: 1 {target_currency} = {reverse_rate:.4f} {base_currency}")
+        # Обратный курс выводится из прямого без повторного запроса к хранилищу
+        if rate:
+            print(f"Обратный курс: 1 {target_currency} = {1.0 / rate:.4f} {base_currency}")
 
 
 def exchange_rate_interface():
@@ -120,13 +155,19 @@ def search_currency_interface():
     print("\nПОИСК ВАЛЮТЫ")
     search_term = input("Введите код валюты для поиска: ").strip().upper()
 
-    available = get_available_currencies()
-    found = [currency for currency in available if search_term in currency]
+    # Сначала быстрый поиск по префиксу, затем поиск по подстроке
+    found = []
+    if _PREFIX_INDEX is not None:
+        found = _PREFIX_INDEX.get(search_term, [])
+    if not found:
+        available = get_available_currencies()
+        found = [currency for currency in available if search_term in currency]
 
     if found:
-        print(f"\nНайдено валют ({len(found)}):")
-        for currency in sorted(found):
-            print(f"  {currency}")
+        sys.stdout.write(
+            f"\nНайдено валют ({len(found)}):\n"
+            + "\n".join(f"  {currency}" for currency in sorted(found)) + "\n"
+        )
     else:
         print(f"Валюты с кодом '{search_term}' не найдены")
 
@@ -135,11 +176,24 @@ def main():
     """Главная функция программы"""
     print("Добро пожаловать в Конвертер Валют!")
 
-    # Загружаем или обновляем данные автоматически
-    data = load_or_update_data()
-
-    if data is None:
-        print("❌ Невозможно загрузить данные. Программа будет работать в ограниченном режиме.")
+    # Загружаем или обновляем данные в фоне, пока пользователь читает меню:
+    # сетевая задержка прячется за временем реакции человека
+    preload = {}
+    loader = threading.Thread(
+        target=lambda: preload.update(data=load_or_update_data()),
+        daemon=True
+    )
+    loader.start()
+
+    def ensure_data_loaded():
+        """Дождаться фоновой загрузки перед первым обращением к данным"""
+        if loader.is_alive():
+            loader.join()
+        if not preload.get("ready"):
+            preload["ready"] = True
+            _refresh_available_currencies()
+            if preload.get("data") is None:
+                print("❌ Невозможно загрузить данные. Программа будет работать в ограниченном режиме.")
 
     while True:
         show_menu()
@@ -149,16 +203,22 @@ def main():
             print("До свидания!")
             break
         elif choice == "1":
+            ensure_data_loaded()
             currency_conversion_interface()
         elif choice == "2":
+            ensure_data_loaded()
             exchange_rate_interface()
         elif choice == "3":
+            ensure_data_loaded()
             display_available_currencies()
         elif choice == "4":
+            ensure_data_loaded()
             print("Принудительное обновление данных...")
-            update_currency_rates()
-            print("✓ Данные успешно обновлены")
+            if force_update_data():
+                _refresh_available_currencies()
+                print("✓ Данные успешно обновлены")
         elif choice == "5":
+            ensure_data_loaded()
             search_currency_interface()
         else:
             print("Некорректный выбор. Попробуйте еще раз.")
@@ -5,10 +5,80 @@
 
 import json
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 
-from api_client import update_currency_rates, FAVORITE_CURRENCIES
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # откат на стандартный json
+
+from api_client import update_currency_rates, FAVORITE_CURRENCIES, SCHEMA_VERSION
+
+# Кэш распарсенных данных в памяти: файл перечитывается
+# только когда меняется время его модификации
+_CACHE: Dict[str, Any] = {"mtime": None, "data": None,
+                          "available": None, "available_set": None}
+
+
+def _get_cached(filename: str = 'currency.json') -> Optional[Dict[str, Any]]:
+    """
+    Получить данные из кэша в памяти, перечитывая файл только при изменении.
+
+    Args:
+        filename (str): Имя файла с данными
+
+    Returns:
+        Optional[Dict[str, Any]]: Данные из кэша/файла или None при ошибке
+    """
+    try:
+        mtime = os.path.getmtime(filename)
+    except OSError:
+        return None
+
+    if _CACHE["data"] is None or _CACHE["mtime"] != mtime:
+        data = read_from_file(filename)
+        if data is None:
+            return None
+        _CACHE["mtime"] = mtime
+        _CACHE["data"] = data
+        _CACHE["available"] = None
+        _CACHE["available_set"] = None
+
+    return _CACHE["data"]
+
+
+def _set_cache(data: Dict[str, Any], filename: str = 'currency.json') -> None:
+    """
+    Положить свежезагруженные данные в кэш в памяти.
+
+    Args:
+        data (Dict[str, Any]): Распарсенные данные о курсах
+        filename (str): Имя файла, из которого они получены
+    """
+    try:
+        _CACHE["mtime"] = os.path.getmtime(filename)
+    except OSError:
+        _CACHE["mtime"] = time.time()
+    _CACHE["data"] = data
+    _CACHE["available"] = None
+    _CACHE["available_set"] = None
+
+
+def _is_fresh(data: Dict[str, Any], hours: int = 24) -> bool:
+    """
+    Проверить свежесть данных по встроенной отметке времени получения.
+
+    Args:
+        data (Dict[str, Any]): Данные о курсах
+        hours (int): Допустимый возраст данных в часах
+
+    Returns:
+        bool: True если данные получены меньше указанного времени назад
+    """
+    fetched_at = data.get("_fetched_at")
+    return fetched_at is not None and time.time() - fetched_at < hours * 3600
 
 
 def save_to_file(data: Dict[str, Any], filename: str = 'currency.json') -> None:
@@ -20,8 +90,29 @@ def save_to_file(data: Dict[str, Any], filename: str = 'currency.json') -> None:
         filename (str): Имя файла (по умолчанию 'currency.json')
     """
     try:
-        with open(filename, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=4, ensure_ascii=False)
+        # Момент получения данных хранится в самом файле: проверка свежести
+        # не зависит от mtime, который сбивается при копировании файла
+        # или переводе часов
+        data["_fetched_at"] = time.time()
+
+        # Компактная запись (~3x меньше и быстрее при чтении);
+        # отформатированный вывод - только для отладки через переменную окружения
+        pretty = bool(os.environ.get("CURRENCY_JSON_PRETTY"))
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            payload = orjson.dumps(data, option=option)
+        else:
+            payload = json.dumps(data, indent=4 if pretty else None,
+                                 separators=None if pretty else (',', ':'),
+                                 ensure_ascii=False).encode('utf-8')
+
+        # Атомарная замена: файл никогда не остается записанным наполовину
+        tmp = filename + ".tmp"
+        with open(tmp, 'wb') as file:
+            file.write(payload)
+        os.replace(tmp, filename)
         print(f"✓ Данные сохранены в файл {filename}")
     except Exception as e:
         print(f"❌ Ошибка сохранения файла {filename}: {e}")
@@ -38,12 +129,15 @@ def read_from_file(filename: str = 'currency.json') -> Optional[Dict[str, Any]]:
         Optional[Dict[str, Any]]: Данные из файла или None при ошибке
     """
     try:
+        if orjson is not None:
+            with open(filename, 'rb') as file:
+                return orjson.loads(file.read())
         with open(filename, 'r', encoding='utf-8') as file:
             return json.load(file)
     except FileNotFoundError:
         print(f"Файл {filename} не найден")
         return None
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print(f"Ошибка чтения JSON из файла {filename}: {e}")
         return None
     except Exception as e:
@@ -87,24 +181,38 @@ def load_or_update_data(filename: str = 'currency.json') -> Optional[Dict[str, A
     Returns:
         Optional[Dict[str, Any]]: Загруженные или обновленные данные
     """
-    if is_file_recent(filename, 24):
-        try:
-            data = read_from_file(filename)
-            if data:
+    # Теплый путь: данные уже разобраны в памяти и еще свежи -
+    # ни stat, ни повторный разбор JSON не нужны
+    if _CACHE["data"] is not None and _is_fresh(_CACHE["data"]):
+        return _CACHE["data"]
+
+    stale_data = None
+    try:
+        data = _get_cached(filename)
+        if data and data.get("schema_version") == SCHEMA_VERSION:
+            # Старые файлы без отметки _fetched_at оцениваем по mtime
+            fresh = (_is_fresh(data) if "_fetched_at" in data
+                     else is_file_recent(filename, 24))
+            if fresh:
                 print("✓ Данные о курсах загружены из файла (актуальны)")
                 return data
-            else:
-                print("⚠ Ошибка чтения файла, будет выполнено обновление данных...")
-        except Exception as e:
-            print(f"⚠ Ошибка чтения файла: {e}")
-            print("Будет выполнено обновление данных...")
+            # Устаревшие данные пригодятся для условного запроса (ETag)
+            stale_data = data
+        elif data:
+            print("⚠ Файл в устаревшем формате, будет выполнено обновление данных...")
+        elif os.path.exists(filename):
+            print("⚠ Ошибка чтения файла, будет выполнено обновление данных...")
+    except Exception as e:
+        print(f"⚠ Ошибка чтения файла: {e}")
+        print("Будет выполнено обновление данных...")
 
     # Файл не существует, старый или ошибка чтения - обновляем данные
     print("Обновление данных о курсах...")
-    all_data = update_currency_rates()
+    all_data = update_currency_rates(stale_data)
 
     if all_data:
         save_to_file(all_data, filename)
+        _set_cache(all_data, filename)
         print("✓ Данные обновлены и загружены")
         return all_data
     else:
@@ -112,41 +220,90 @@ def load_or_update_data(filename: str = 'currency.json') -> Optional[Dict[str, A
         return None
 
 
+def force_update_data(filename: str = 'currency.json') -> Optional[Dict[str, Any]]:
+    """
+    Принудительно обновить данные из API, минуя проверку свежести.
+
+    Сохраняет результат в файл и обновляет кэш в памяти, чтобы
+    последующие вызовы get_exchange_rate сразу видели новые курсы.
+
+    Args:
+        filename (str): Имя файла для кэширования данных
+
+    Returns:
+        Optional[Dict[str, Any]]: Обновленные данные или None при ошибке
+    """
+    all_data = update_currency_rates(_CACHE["data"])
+
+    if not all_data:
+        print("❌ Не удалось получить данные из API")
+        return None
+
+    save_to_file(all_data, filename)
+    _set_cache(all_data, filename)
+    return all_data
+
+
 def get_available_currencies() -> list:
-    """Получить список всех доступных валют из файла"""
+    """Получить список всех доступных валют из кэша/файла"""
     try:
-        data = read_from_file()
+        data = _CACHE["data"] if _CACHE["data"] is not None else _get_cached()
         if not data:
             return []
 
-        # Возьмем валюты из первой доступной базовой валюты
-        first_base = list(data.keys())[0]
-        return list(data[first_base]['rates'].keys())
+        if _CACHE["available"] is None:
+            _CACHE["available"] = list(data['rates'].keys())
+            _CACHE["available_set"] = frozenset(_CACHE["available"])
+        return _CACHE["available"]
     except Exception:
         return []
 
 
-def get_exchange_rate(base_currency: str, target_currency: str):
-    """Получить курс обмена между двумя валютами"""
+def is_currency_available(currency_code: str) -> bool:
+    """Проверить наличие валюты за O(1) по кэшированному множеству кодов"""
+    get_available_currencies()
+    available = _CACHE.get("available_set")
+    return available is not None and currency_code in available
+
+
+def get_exchange_rate(base_currency: str, target_currency: str,
+                      data: Optional[Dict[str, Any]] = None):
+    """
+    Получить курс обмена между двумя валютами.
+
+    По умолчанию используются данные, уже загруженные в память
+    (load_or_update_data), так что в горячем пути остается только
+    поиск по словарю - без обращений к файловой системе.
+    """
     try:
-        data = read_from_file()
-        if not data or base_currency not in data:
+        if data is None:
+            data = _CACHE["data"] if _CACHE["data"] is not None else _get_cached()
+        if not data:
             return None, f"Базовая валюта {base_currency} не найдена"
 
-        rates = data[base_currency]['rates']
+        # Любой кросс-курс вычисляется из единой таблицы курсов
+        rates = data['rates']
+        if base_currency not in rates:
+            return None, f"Базовая валюта {base_currency} не найдена"
         if target_currency not in rates:
             return None, f"Целевая валюта {target_currency} не найдена"
 
-        return rates[target_currency], None
+        return rates[target_currency] / rates[base_currency], None
     except Exception as e:
         return None, f"Ошибка при получении курса: {str(e)}"
 
 
-def convert_currency(amount: float, base_currency: str, target_currency: str):
-    """Конвертировать сумму из одной валюты в другую"""
-    rate, error = get_exchange_rate(base_currency, target_currency)
+def convert_currency(amount: float, base_currency: str, target_currency: str,
+                     data: Optional[Dict[str, Any]] = None):
+    """
+    Конвертировать сумму из одной валюты в другую.
+
+    Возвращает также сам курс, чтобы вызывающий код мог вычислить
+    обратный курс (1 / rate) без повторного обращения к хранилищу.
+    """
+    rate, error = get_exchange_rate(base_currency, target_currency, data)
     if error:
-        return None, error
+        return None, None, error
 
     converted_amount = amount * rate
-    return converted_amount, None
+    return converted_amount, rate, None